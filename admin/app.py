@@ -6,12 +6,22 @@ Includes automatic Hugo site rebuild after content changes
 """
 import os
 import re
+import shutil
+import bisect
+import difflib
+import hashlib
+import heapq
+import mmap
+import struct
+import zlib
 import yaml
 import markdown
 import subprocess
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -41,6 +51,13 @@ TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '8350357441:AAHvxCDGGW
 TELEGRAM_CHANNEL_ID = os.environ.get('TELEGRAM_CHANNEL_ID', '@nodkeys_i')
 SITE_URL = os.environ.get('SITE_URL', 'https://nodkeys.com')
 
+# Content index configuration
+INDEX_WORKERS = int(os.environ.get('INDEX_WORKERS', '8'))
+
+# Memory budget (MB) for git objects and pack delta bases cached for post history
+GIT_CACHE_MB = int(os.environ.get('GIT_CACHE_MB', '64'))
+GIT_DELTA_CACHE_MB = int(os.environ.get('GIT_DELTA_CACHE_MB', '16'))
+
 # Ensure directories exist
 POSTS_DIR.mkdir(parents=True, exist_ok=True)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -133,13 +150,372 @@ def git_commit(message):
         print(f"Git commit failed: {e}")
         return False
 
-def send_to_telegram(title, slug, description='', image=''):
+# Git History
+# Reads commits, trees and blobs directly from .git (loose objects and packfiles)
+# so post history and diffs don't need a git subprocess per revision.
+
+class LRUCache:
+    """Small thread-safe LRU cache capped by the total size of its values in bytes"""
+    def __init__(self, maxbytes):
+        self.maxbytes = maxbytes
+        self.size = 0
+        self._data = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, size):
+        if size > self.maxbytes:
+            return  # Too large to cache; don't evict everything else for it
+        with self._lock:
+            if key in self._data:
+                self.size -= self._data.pop(key)[1]
+            self._data[key] = (value, size)
+            self.size += size
+            while self.size > self.maxbytes:
+                self.size -= self._data.popitem(last=False)[1][1]
+
+def read_varint(data, pos):
+    """Read a little-endian base-128 varint (used by delta headers)"""
+    value = shift = 0
+    while True:
+        c = data[pos]
+        pos += 1
+        value |= (c & 0x7f) << shift
+        shift += 7
+        if not c & 0x80:
+            return value, pos
+
+def apply_delta(base, delta):
+    """Apply a git pack delta to its base object"""
+    _, pos = read_varint(delta, 0)
+    size, pos = read_varint(delta, pos)
+    out = bytearray()
+    while pos < len(delta):
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            offset = length = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (0x10 << i):
+                    length |= delta[pos] << (8 * i)
+                    pos += 1
+            out += base[offset:offset + (length or 0x10000)]
+        elif op:
+            out += delta[pos:pos + op]
+            pos += op
+        else:
+            raise ValueError('Invalid delta opcode')
+    if len(out) != size:
+        raise ValueError('Delta size mismatch')
+    return bytes(out)
+
+def parse_tree(data):
+    """Parse tree object into {name: (mode, sha)}"""
+    entries = {}
+    pos = 0
+    while pos < len(data):
+        space = data.index(b' ', pos)
+        nul = data.index(b'\0', space)
+        mode = data[pos:space].decode()
+        name = data[space + 1:nul].decode('utf-8', 'surrogateescape')
+        entries[name] = (mode, data[nul + 1:nul + 21].hex())
+        pos = nul + 21
+    return entries
+
+def parse_commit(data):
+    """Parse commit object headers and message"""
+    headers, _, message = data.partition(b'\n\n')
+    commit = {'type': 'commit', 'tree': None, 'parents': [], 'message': message.decode('utf-8', 'replace')}
+    for line in headers.split(b'\n'):
+        if line.startswith(b' '):
+            continue  # Continuation of a multi-line header (e.g. gpgsig)
+        key, _, value = line.decode('utf-8', 'replace').partition(' ')
+        if key == 'tree':
+            commit['tree'] = value
+        elif key == 'parent':
+            commit['parents'].append(value)
+        elif key in ('author', 'committer'):
+            ident, _, stamp = value.rpartition('> ')
+            timestamp, tz = stamp.split()
+            offset = (int(tz[1:3]) * 60 + int(tz[3:5])) * (-1 if tz[0] == '-' else 1)
+            commit[key] = ident.split(' <')[0]
+            commit[key + '_date'] = datetime.fromtimestamp(int(timestamp), timezone(timedelta(minutes=offset)))
+    return commit
+
+class GitPack:
+    """Packfile with its version 2 index"""
+    def __init__(self, idx_path):
+        data = idx_path.read_bytes()
+        if data[:4] != b'\xfftOc' or struct.unpack('>I', data[4:8])[0] != 2:
+            raise ValueError(f'Unsupported pack index: {idx_path}')
+        count = struct.unpack('>256I', data[8:1032])[255]
+        shas_end = 1032 + count * 20
+        offsets_start = shas_end + count * 4  # Skip CRC32 table
+        large_start = offsets_start + count * 4
+        self.shas = [data[1032 + i * 20:1052 + i * 20] for i in range(count)]
+        self.offsets = []
+        for offset in struct.unpack(f'>{count}I', data[offsets_start:large_start]):
+            if offset & 0x80000000:
+                i = large_start + (offset & 0x7fffffff) * 8
+                offset = struct.unpack('>Q', data[i:i + 8])[0]
+            self.offsets.append(offset)
+        self.path = idx_path.with_suffix('.pack')
+        with open(self.path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def find(self, sha):
+        """Return offset of object in pack, or None"""
+        raw = bytes.fromhex(sha)
+        i = bisect.bisect_left(self.shas, raw)
+        if i < len(self.shas) and self.shas[i] == raw:
+            return self.offsets[i]
+        return None
+
+    def read_entry(self, offset):
+        """Read pack entry: (type_num, data, base) where base is a pack offset or sha for deltas"""
+        data = self.data
+        pos = offset
+        c = data[pos]
+        pos += 1
+        type_num = (c >> 4) & 7
+        while c & 0x80:
+            c = data[pos]
+            pos += 1
+        base = None
+        if type_num == 6:  # OFS_DELTA
+            c = data[pos]
+            pos += 1
+            distance = c & 0x7f
+            while c & 0x80:
+                c = data[pos]
+                pos += 1
+                distance = ((distance + 1) << 7) | (c & 0x7f)
+            base = offset - distance
+        elif type_num == 7:  # REF_DELTA
+            base = data[pos:pos + 20].hex()
+            pos += 20
+        decompressor = zlib.decompressobj()
+        chunks = []
+        while not decompressor.eof:
+            chunk = data[pos:pos + 65536]
+            if not chunk:
+                raise ValueError('Truncated pack entry')
+            chunks.append(decompressor.decompress(chunk))
+            pos += len(chunk)
+        return type_num, b''.join(chunks), base
+
+class GitRepository:
+    """Read-only access to a git repository's objects with an LRU object cache"""
+    TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+
+    def __init__(self, path, cache_mb=GIT_CACHE_MB, delta_cache_mb=GIT_DELTA_CACHE_MB):
+        self.worktree, self.git_dir = self._find_git_dir(Path(path).resolve())
+        self.common_dir = self.git_dir
+        if self.git_dir and (self.git_dir / 'commondir').exists():
+            self.common_dir = (self.git_dir / (self.git_dir / 'commondir').read_text().strip()).resolve()
+        self.cache = LRUCache(cache_mb * 1024 * 1024)  # Parsed objects by sha
+        self.delta_bases = LRUCache(delta_cache_mb * 1024 * 1024)  # Delta bases by pack offset
+        self._packs = None
+        self._packs_lock = threading.Lock()
+
+    @staticmethod
+    def _find_git_dir(path):
+        """Locate the worktree root and .git directory above path"""
+        for candidate in (path, *path.parents):
+            dot_git = candidate / '.git'
+            if dot_git.is_dir():
+                return candidate, dot_git
+            if dot_git.is_file():
+                content = dot_git.read_text().strip()
+                if content.startswith('gitdir:'):
+                    return candidate, (candidate / content[7:].strip()).resolve()
+        return None, None
+
+    def _load_packs(self, reload=False):
+        with self._packs_lock:
+            if self._packs is None or reload:
+                packs = []
+                for idx in sorted((self.common_dir / 'objects' / 'pack').glob('*.idx')):
+                    try:
+                        packs.append(GitPack(idx))
+                    except Exception as e:
+                        print(f"[Git] Skipping pack {idx.name}: {e}")
+                self._packs = packs
+            return self._packs
+
+    def _pack_object(self, pack, offset, is_base=False):
+        """Read and resolve a (possibly deltified) pack entry; only delta bases are cached here"""
+        key = (str(pack.path), offset)
+        cached = self.delta_bases.get(key)
+        if cached is not None:
+            return cached
+        type_num, data, base = pack.read_entry(offset)
+        if type_num == 6:
+            base_type, base_data = self._pack_object(pack, base, is_base=True)
+            result = (base_type, apply_delta(base_data, data))
+        elif type_num == 7:
+            base_type, base_data = self._raw(base)
+            result = (base_type, apply_delta(base_data, data))
+        else:
+            result = (self.TYPES[type_num], data)
+        if is_base:
+            self.delta_bases.put(key, result, len(result[1]))
+        return result
+
+    def _raw(self, sha):
+        """Return (type, data) for an object from loose storage or packs"""
+        if not isinstance(sha, str) or not re.fullmatch(r'[0-9a-f]{40}', sha):
+            raise KeyError(sha)
+        loose = self.common_dir / 'objects' / sha[:2] / sha[2:]
+        if loose.exists():
+            header, _, data = zlib.decompress(loose.read_bytes()).partition(b'\0')
+            return header.split(b' ')[0].decode(), data
+        for reload in (False, True):
+            for pack in self._load_packs(reload):
+                offset = pack.find(sha)
+                if offset is not None:
+                    return self._pack_object(pack, offset)
+        raise KeyError(sha)
+
+    def object(self, sha):
+        """Return parsed object: dict for commits and trees, bytes for blobs"""
+        cached = self.cache.get(sha)
+        if cached is not None:
+            return cached
+        type_name, data = self._raw(sha)
+        if type_name == 'commit':
+            value = parse_commit(data)
+        elif type_name == 'tree':
+            value = parse_tree(data)
+        else:
+            value = data
+        self.cache.put(sha, value, len(data))
+        return value
+
+    def commit(self, sha):
+        """Return a parsed commit, raising ValueError if sha is another object type"""
+        value = self.object(sha)
+        if not isinstance(value, dict) or value.get('type') != 'commit':
+            raise ValueError(f'{sha} is not a commit')
+        return value
+
+    def resolve_ref(self, ref='HEAD'):
+        """Resolve a ref (following symbolic refs) to a commit sha"""
+        if not self.git_dir:
+            return None
+        for _ in range(10):
+            path = self.git_dir / ref
+            if not path.exists():
+                path = self.common_dir / ref
+            if path.is_file():
+                content = path.read_text().strip()
+                if not content.startswith('ref: '):
+                    return content
+                ref = content[5:]
+                continue
+            packed = self.common_dir / 'packed-refs'
+            if packed.exists():
+                for line in packed.read_text().splitlines():
+                    sha, _, name = line.partition(' ')
+                    if name == ref:
+                        return sha
+            return None
+        return None
+
+    def relative_path(self, file_path):
+        """Path of a worktree file relative to the repository root"""
+        return Path(file_path).resolve().relative_to(self.worktree).as_posix()
+
+    def blob_id(self, commit_sha, path):
+        """Return the blob sha of path at a commit, or None if absent"""
+        tree = self.commit(commit_sha)['tree']
+        parts = path.split('/')
+        for i, part in enumerate(parts):
+            entry = self.object(tree).get(part)
+            if entry is None:
+                return None
+            mode, sha = entry
+            is_tree = mode.startswith('4')
+            if i == len(parts) - 1:
+                return None if is_tree else sha
+            if not is_tree:
+                return None
+            tree = sha
+        return None
+
+    def file_history(self, path, limit=100):
+        """
+        Return commits that changed path, newest first, like `git log -- path`.
+        Commits that deleted the file are included with blob set to None.
+        """
+        head = self.resolve_ref('HEAD')
+        if not head:
+            return []
+        revisions = []
+        heap = [(-self.commit(head)['committer_date'].timestamp(), head)]
+        seen = {head}
+        while heap and len(revisions) < limit:
+            _, sha = heapq.heappop(heap)
+            blob = self.blob_id(sha, path)
+            commit = self.commit(sha)
+            parents = commit['parents']
+            same = [p for p in parents if self.blob_id(p, path) == blob]
+            changed = not same if parents else blob is not None
+            if changed:
+                revisions.append({
+                    'sha': sha,
+                    'short': sha[:7],
+                    'blob': blob,
+                    'deleted': blob is None,
+                    'author': commit.get('author', ''),
+                    'date': commit.get('author_date'),
+                    'message': commit['message'].strip(),
+                    'summary': commit['message'].strip().split('\n')[0],
+                })
+            for parent in (same[:1] or parents):
+                if parent not in seen:
+                    seen.add(parent)
+                    heapq.heappush(heap, (-self.commit(parent)['committer_date'].timestamp(), parent))
+        return revisions
+
+    def read_file(self, commit_sha, path):
+        """Return file content at a commit as text, or None if absent"""
+        blob = self.blob_id(commit_sha, path)
+        if blob is None:
+            return None
+        return self.object(blob).decode('utf-8', 'replace')
+
+git_repo = GitRepository(HUGO_ROOT)
+
+def diff_texts(old, new, old_label, new_label):
+    """Unified diff between two texts as a list of lines"""
+    return list(difflib.unified_diff(
+        (old or '').splitlines(), (new or '').splitlines(),
+        fromfile=old_label, tofile=new_label, lineterm=''
+    ))
+
+def send_to_telegram(title, slug, description='', image='', lang=None):
     """
     Send post notification to Telegram channel (like @opennet_ru style)
     Format: **Title** URL (with link preview)
     """
     try:
-        post_url = f"{SITE_URL}/posts/{slug}/"
+        lang_prefix = f"/{lang}" if lang and lang != DEFAULT_LANGUAGE else ''
+        post_url = f"{SITE_URL}{lang_prefix}/posts/{slug}/"
         
         # Format message like opennet_ru: Title + URL
         # Telegram will auto-generate link preview
@@ -179,9 +555,9 @@ def send_to_telegram(title, slug, description='', image=''):
         print(f"[Telegram] Error: {e}")
         return False, str(e)
 
-def send_to_telegram_async(title, slug, description='', image=''):
+def send_to_telegram_async(title, slug, description='', image='', lang=None):
     """Send to Telegram in background thread"""
-    thread = threading.Thread(target=send_to_telegram, args=(title, slug, description, image))
+    thread = threading.Thread(target=send_to_telegram, args=(title, slug, description, image, lang))
     thread.daemon = True
     thread.start()
 
@@ -198,13 +574,25 @@ def parse_frontmatter(content):
                 pass
     return {}, content
 
-def create_frontmatter(data):
-    """Create YAML frontmatter string"""
-    frontmatter = {
+def format_frontmatter_date(date_val):
+    """Format a date for frontmatter; naive datetimes are site-local (+03:00)"""
+    if isinstance(date_val, datetime) and date_val.tzinfo is None:
+        return date_val.strftime('%Y-%m-%dT%H:%M:%S+03:00')
+    if hasattr(date_val, 'isoformat'):
+        return date_val.isoformat()
+    return str(date_val)
+
+# Frontmatter keys edited through the admin form; other keys are kept as-is on save
+MANAGED_FRONTMATTER_KEYS = ('title', 'date', 'draft', 'description', 'tags', 'categories', 'image')
+
+def create_frontmatter(data, existing=None):
+    """Create YAML frontmatter string, keeping keys from existing that the form doesn't manage"""
+    frontmatter = {k: v for k, v in (existing or {}).items() if k not in MANAGED_FRONTMATTER_KEYS}
+    frontmatter.update({
         'title': data.get('title', 'Untitled'),
-        'date': data.get('date', datetime.now()).strftime('%Y-%m-%dT%H:%M:%S+03:00') if hasattr(data.get('date', datetime.now()), 'strftime') else str(data.get('date', '')),
+        'date': format_frontmatter_date(data.get('date', datetime.now())),
         'draft': data.get('draft', False),
-    }
+    })
     
     if data.get('description'):
         frontmatter['description'] = data['description']
@@ -221,54 +609,354 @@ def create_frontmatter(data):
     
     return '---\n' + yaml.dump(frontmatter, allow_unicode=True, default_flow_style=False) + '---\n\n'
 
+# Change Detection
+# Writes are skipped when the normalised content is unchanged, so repeated saves
+# and idle autosaves don't trigger commits, rebuilds or notifications.
+
+write_stats = {'performed': 0, 'skipped': 0}
+write_stats_lock = threading.Lock()
+
+def content_fingerprint(text):
+    """Hash of normalised frontmatter and body; key order and YAML formatting are ignored"""
+    frontmatter, body = parse_frontmatter(text.replace('\r\n', '\n'))
+    normalised = json.dumps(frontmatter, sort_keys=True, ensure_ascii=False,
+                            default=lambda v: v.isoformat() if hasattr(v, 'isoformat') else str(v))
+    return hashlib.sha256(f"{normalised}\0{body.strip()}".encode('utf-8')).hexdigest()
+
+def write_if_changed(file_path, content):
+    """Write content unless the file already has the same fingerprint; returns True if written"""
+    file_path = Path(file_path)
+    changed = True
+    if file_path.exists():
+        try:
+            changed = content_fingerprint(file_path.read_text(encoding='utf-8')) != content_fingerprint(content)
+        except UnicodeDecodeError:
+            pass
+    if changed:
+        file_path.write_text(content, encoding='utf-8')
+        content_index.invalidate(file_path)
+    else:
+        print(f"[Write] Skipped unchanged {file_path.name}")
+    with write_stats_lock:
+        write_stats['performed' if changed else 'skipped'] += 1
+    return changed
+
+def has_uncommitted_changes(file_path):
+    """True if a file differs from its committed version, e.g. after an autosave"""
+    head = git_repo.resolve_ref('HEAD')
+    if not head:
+        return False
+    try:
+        committed = git_repo.read_file(head, git_repo.relative_path(file_path))
+    except (KeyError, ValueError, zlib.error) as e:
+        print(f"[Git] Could not read {file_path.name} at HEAD: {e}")
+        return True
+    if committed is None:
+        return True
+    return content_fingerprint(committed) != content_fingerprint(file_path.read_text(encoding='utf-8'))
+
+def existing_frontmatter(file_path):
+    """Frontmatter of an existing file, so re-saving keeps its date and unmanaged keys"""
+    if file_path and file_path.exists():
+        try:
+            frontmatter, _ = parse_frontmatter(file_path.read_text(encoding='utf-8'))
+            if isinstance(frontmatter, dict):
+                return frontmatter
+        except Exception:
+            pass
+    return {}
+
+# Content Index
+# Walks the whole CONTENT_DIR tree: sections (_index.md), page bundles (<slug>/index.md),
+# regular pages and their .<lang>.md translation variants.
+
+def load_site_languages():
+    """Read default and configured languages from hugo.yaml"""
+    try:
+        config = yaml.safe_load((HUGO_ROOT / 'hugo.yaml').read_text(encoding='utf-8')) or {}
+    except Exception as e:
+        print(f"[Index] Could not read hugo.yaml: {e}")
+        config = {}
+    default = str(config.get('defaultContentLanguage', 'en')).lower()
+    languages = [str(lang).lower() for lang in (config.get('languages') or {})]
+    if default not in languages:
+        languages.insert(0, default)
+    return default, languages
+
+DEFAULT_LANGUAGE, SITE_LANGUAGES = load_site_languages()
+
+def split_content_name(name):
+    """Split 'about.fr.md' into ('about', 'fr'); untagged files use the default language"""
+    stem = name[:-3]
+    base, dot, lang = stem.rpartition('.')
+    if dot and lang.lower() in SITE_LANGUAGES:
+        return base, lang.lower()
+    return stem, DEFAULT_LANGUAGE
+
+class ContentIndex:
+    """
+    Incremental index of all pages under a Hugo content directory.
+    A directory whose mtime is unchanged is trusted as-is; otherwise it is
+    re-listed and only files whose mtime changed are re-read. Writes made by
+    the admin call invalidate(), and the tree is rescanned at most once per
+    request (see mark_stale()). Each level of the tree is scanned in parallel.
+    """
+    def __init__(self, root, workers=INDEX_WORKERS):
+        self.root = Path(root)
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._dirs = {}   # relative dir -> [mtime_ns, subdirs_to_walk, {relative path: page}]
+        self._pages = {}  # relative file path -> page dict
+        self._lock = threading.Lock()
+        self._stale = True
+        self.stats = {}
+
+    def _scan_dir(self, rel):
+        """Scan one directory; returns (entry, stats) or None if gone"""
+        path = self.root / rel
+        stats = {'dirs_listed': 0, 'dirs_cached': 0, 'files_read': 0, 'files_cached': 0}
+        try:
+            mtime = path.stat().st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        cached = self._dirs.get(rel)
+        if cached and cached[0] == mtime:
+            stats['dirs_cached'] += 1
+            stats['files_cached'] += len(cached[2])
+            return cached, stats
+
+        files, subdirs = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                    elif entry.name.endswith('.md') and entry.is_file():
+                        files.append(entry.name)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        stats['dirs_listed'] += 1
+
+        previous = cached[2] if cached else {}
+        parts = Path(rel).parts
+        section = parts[0] if parts else ''
+        names = [split_content_name(f) for f in files]
+        is_leaf_bundle = any(base == 'index' for base, _ in names)
+
+        pages = {}
+        for file, (base, lang) in zip(files, names):
+            if base == '_index':
+                kind = 'section' if parts else 'home'
+                key = (rel + '/') if parts else '/'
+            elif base == 'index':
+                kind = 'bundle'
+                key = rel
+            elif is_leaf_bundle:
+                continue  # Markdown resources of a leaf bundle are not pages
+            else:
+                kind = 'page'
+                key = f"{rel}/{base}" if parts else base
+
+            rel_path = f"{rel}/{file}" if parts else file
+            try:
+                file_mtime = (path / file).stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+            page = previous.get(rel_path)
+            if page and page['mtime'] == file_mtime:
+                stats['files_cached'] += 1
+            else:
+                try:
+                    frontmatter, body = parse_frontmatter((path / file).read_text(encoding='utf-8'))
+                except Exception as e:
+                    print(f"[Index] Error reading {rel_path}: {e}")
+                    continue
+                frontmatter = frontmatter if isinstance(frontmatter, dict) else {}
+                page = {
+                    'path': rel_path,
+                    'section': section,
+                    'kind': kind,
+                    'lang': lang,
+                    'key': key,
+                    'translation_key': str(frontmatter.get('translationKey') or ''),
+                    'mtime': file_mtime,
+                    'frontmatter': frontmatter,
+                    'body': body,
+                }
+                stats['files_read'] += 1
+            pages[rel_path] = page
+
+        # Subdirectories of a leaf bundle hold resources, not pages
+        walk = [] if is_leaf_bundle else [f"{rel}/{d}" if parts else d for d in sorted(subdirs)]
+        return [mtime, walk, pages], stats
+
+    def scan(self):
+        """Rescan the tree, reusing directories whose mtime has not changed"""
+        with self._lock:
+            dirs, pages = {}, {}
+            stats = {'dirs_listed': 0, 'dirs_cached': 0, 'files_read': 0, 'files_cached': 0}
+            pending = ['']
+            while pending:
+                next_level = []
+                for rel, result in zip(pending, self._pool.map(self._scan_dir, pending)):
+                    if result is None:
+                        continue
+                    entry, dir_stats = result
+                    dirs[rel] = entry
+                    pages.update(entry[2])
+                    next_level.extend(entry[1])
+                    for name, count in dir_stats.items():
+                        stats[name] += count
+                pending = next_level
+            self._dirs, self._pages, self.stats = dirs, pages, stats
+            self._stale = False
+            return pages
+
+    def mark_stale(self):
+        """Rescan on next access; called once per request"""
+        self._stale = True
+
+    def invalidate(self, path):
+        """Forget a file or directory the admin has written or deleted"""
+        try:
+            rel = Path(path).resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return
+        parent = Path(rel).parent.as_posix()
+        with self._lock:
+            entry = self._dirs.get('' if parent == '.' else parent)
+            if entry:
+                entry[0] = None  # Force the directory to be re-listed
+                entry[2].pop(rel, None)
+            self._dirs.pop(rel, None)
+            self._stale = True
+
+    def refresh(self):
+        """Return indexed pages, scanning only if stale"""
+        if self._stale:
+            return self.scan()
+        return self._pages
+
+    def pages(self, section=None, kinds=None, lang=None):
+        """Return indexed pages, newest first, optionally filtered"""
+        result = [
+            p for p in self.refresh().values()
+            if (section is None or p['section'] == section)
+            and (kinds is None or p['kind'] in kinds)
+            and (lang is None or p['lang'] == lang)
+        ]
+        result.sort(key=lambda p: p['mtime'], reverse=True)
+        return result
+
+    @staticmethod
+    def group_key(page):
+        """Translation group of a page: its translationKey if set, otherwise its path"""
+        if page['translation_key']:
+            return ('translationKey', page['translation_key'])
+        return (page['section'], page['key'])
+
+    def translations(self, section=None):
+        """
+        Group pages by translation; variants ordered as languages in hugo.yaml.
+        With section, only groups containing a page of that section are returned.
+        """
+        groups = {}
+        for page in self.pages():
+            groups.setdefault(self.group_key(page), []).append(page)
+        order = {lang: i for i, lang in enumerate(SITE_LANGUAGES)}
+        for variants in groups.values():
+            variants.sort(key=lambda p: order.get(p['lang'], len(order)))
+        if section is not None:
+            groups = {k: v for k, v in groups.items() if any(p['section'] == section for p in v)}
+        return groups
+
+content_index = ContentIndex(CONTENT_DIR)
+
+@app.before_request
+def refresh_content_index():
+    """Let the content index rescan at most once per request"""
+    content_index.mark_stale()
+
+def format_date(date_val):
+    """Format a frontmatter date value as YYYY-MM-DD"""
+    if hasattr(date_val, 'strftime'):
+        return date_val.strftime('%Y-%m-%d')
+    elif date_val:
+        return str(date_val)[:10]
+    return ''
+
+def post_path(filename):
+    """Resolve a post filename ('slug.md', 'slug.fr.md' or 'slug/index.md') inside POSTS_DIR"""
+    file_path = (POSTS_DIR / filename).resolve()
+    if file_path.suffix != '.md' or POSTS_DIR.resolve() not in file_path.parents:
+        return None
+    return file_path
+
+def post_slug(filename):
+    """Get the URL slug for a post filename, ignoring bundle and language suffixes"""
+    path = Path(filename)
+    base, _ = split_content_name(path.name)
+    if base == 'index' and len(path.parts) > 1:
+        return path.parent.name
+    return base
+
+def post_exists(slug):
+    """True if any post or translation variant already uses this slug"""
+    key = f"posts/{slug}"
+    return (POSTS_DIR / f"{slug}.md").exists() or any(
+        p['key'] == key for p in content_index.pages(section='posts', kinds=('page', 'bundle'))
+    )
+
+def post_language(filename):
+    """Language of a post file from its .<lang>.md suffix"""
+    return split_content_name(Path(filename).name)[1]
+
+def published_translations(filename):
+    """Other language variants of a post that are already published"""
+    path = f"posts/{filename}"
+    for variants in content_index.translations(section='posts').values():
+        if any(v['path'] == path for v in variants):
+            return [v for v in variants if v['path'] != path and not v['frontmatter'].get('draft', False)]
+    return []
+
 def get_posts():
-    """Get all posts from content directory"""
+    """Get all posts (regular pages and page bundles) from the content index"""
     posts = []
-    if POSTS_DIR.exists():
-        for file in sorted(POSTS_DIR.glob('*.md'), key=lambda x: x.stat().st_mtime, reverse=True):
-            try:
-                content = file.read_text(encoding='utf-8')
-                frontmatter, body = parse_frontmatter(content)
-                date_val = frontmatter.get('date', '')
-                if hasattr(date_val, 'strftime'):
-                    date_str = date_val.strftime('%Y-%m-%d')
-                elif date_val:
-                    date_str = str(date_val)[:10]
-                else:
-                    date_str = ''
-                posts.append({
-                    'filename': file.name,
-                    'title': frontmatter.get('title', file.stem),
-                    'date': date_str,
-                    'draft': frontmatter.get('draft', False),
-                    'description': frontmatter.get('description', ''),
-                    'tags': frontmatter.get('tags', []),
-                    'categories': frontmatter.get('categories', []),
-                    'content': body,
-                    'word_count': len(body.split()),
-                })
-            except Exception as e:
-                print(f"Error reading {file}: {e}")
+    groups = content_index.translations(section='posts')
+    pages = [(p, variants) for variants in groups.values() for p in variants
+             if p['section'] == 'posts' and p['kind'] in ('page', 'bundle')]
+    pages.sort(key=lambda item: item[0]['mtime'], reverse=True)
+    for page, variants in pages:
+        frontmatter, body = page['frontmatter'], page['body']
+        filename = page['path'][len('posts/'):]
+        posts.append({
+            'filename': filename,
+            'title': frontmatter.get('title', post_slug(filename)),
+            'date': format_date(frontmatter.get('date', '')),
+            'draft': frontmatter.get('draft', False),
+            'description': frontmatter.get('description', ''),
+            'tags': frontmatter.get('tags', []),
+            'categories': frontmatter.get('categories', []),
+            'content': body,
+            'word_count': len(body.split()),
+            'lang': page['lang'],
+            'bundle': page['kind'] == 'bundle',
+            'translations': [v['lang'] for v in variants if v['path'] != page['path']],
+        })
     return posts
 
 def get_post(filename):
     """Get single post by filename"""
-    file_path = POSTS_DIR / filename
-    if file_path.exists():
+    file_path = post_path(filename)
+    if file_path and file_path.exists():
         try:
             content = file_path.read_text(encoding='utf-8')
             frontmatter, body = parse_frontmatter(content)
-            date_val = frontmatter.get('date', '')
-            if hasattr(date_val, 'strftime'):
-                date_str = date_val.strftime('%Y-%m-%d')
-            elif date_val:
-                date_str = str(date_val)[:10]
-            else:
-                date_str = ''
             return {
                 'filename': filename,
-                'title': frontmatter.get('title', file_path.stem),
-                'date': date_str,
+                'title': frontmatter.get('title', post_slug(filename)),
+                'date': format_date(frontmatter.get('date', '')),
                 'draft': frontmatter.get('draft', False),
                 'description': frontmatter.get('description', ''),
                 'tags': ', '.join(frontmatter.get('tags', [])) if isinstance(frontmatter.get('tags'), list) else frontmatter.get('tags', ''),
@@ -281,16 +969,20 @@ def get_post(filename):
     return None
 
 def save_post(filename, data):
-    """Save post to file"""
+    """Save post to file; returns (success, changed)"""
     try:
-        file_path = POSTS_DIR / filename
-        frontmatter = create_frontmatter(data)
+        file_path = post_path(filename)
+        if file_path is None:
+            raise ValueError('invalid post path')
+        existing = existing_frontmatter(file_path)
+        if 'date' not in data and existing.get('date'):
+            data = dict(data, date=existing['date'])
+        frontmatter = create_frontmatter(data, existing)
         content = frontmatter + data.get('content', '')
-        file_path.write_text(content, encoding='utf-8')
-        return True
+        return True, write_if_changed(file_path, content)
     except Exception as e:
         print(f"Error saving {filename}: {e}")
-        return False
+        return False, False
 
 # Routes - all use explicit /admin prefix in redirects
 @app.route('/')
@@ -303,6 +995,7 @@ def index():
         'published': len([p for p in posts if not p['draft']]),
         'drafts': len([p for p in posts if p['draft']]),
         'total_words': sum(p['word_count'] for p in posts),
+        'writes': dict(write_stats),
     }
     return render_template('index.html', stats=stats, recent_posts=posts[:5])
 
@@ -342,6 +1035,27 @@ def posts():
     all_posts = get_posts()
     return render_template('posts.html', posts=all_posts)
 
+@app.route('/content')
+@login_required
+def content():
+    """Overview of the whole content tree grouped by translation"""
+    groups = content_index.translations()
+    pages = []
+    for _, variants in sorted(groups.items()):
+        primary = next((v for v in variants if v['lang'] == DEFAULT_LANGUAGE), variants[0])
+        pages.append({
+            'key': primary['translation_key'] or primary['key'],
+            'section': primary['section'],
+            'kind': primary['kind'],
+            'title': primary['frontmatter'].get('title', primary['key']),
+            'variants': [{
+                'lang': v['lang'],
+                'path': v['path'],
+                'post': v['section'] == 'posts' and v['kind'] in ('page', 'bundle'),
+            } for v in variants],
+        })
+    return render_template('content.html', pages=pages, languages=SITE_LANGUAGES, stats=content_index.stats)
+
 @app.route('/posts/new', methods=['GET', 'POST'])
 @login_required
 def new_post():
@@ -358,7 +1072,7 @@ def new_post():
         
         filename = f"{slug}.md"
         
-        if (POSTS_DIR / filename).exists():
+        if post_exists(slug):
             flash(f'A post with slug "{slug}" already exists', 'error')
             return render_template('edit_post.html', post=None)
         
@@ -373,7 +1087,8 @@ def new_post():
             'date': datetime.now()
         }
         
-        if save_post(filename, data):
+        saved, _ = save_post(filename, data)
+        if saved:
             git_commit(f"Add new post: {title}")
             # Rebuild Hugo site after creating post
             rebuild_hugo_async()
@@ -390,7 +1105,7 @@ def new_post():
     
     return render_template('edit_post.html', post=None)
 
-@app.route('/posts/edit/<filename>', methods=['GET', 'POST'])
+@app.route('/posts/edit/<path:filename>', methods=['GET', 'POST'])
 @login_required
 def edit_post(filename):
     """Edit existing post"""
@@ -414,15 +1129,23 @@ def edit_post(filename):
             post = get_post(filename)
             return render_template('edit_post.html', post=post)
         
-        if save_post(filename, data):
+        saved, changed = save_post(filename, data)
+        if saved and not changed and not has_uncommitted_changes(post_path(filename)):
+            flash(f'No changes to save in "{data["title"]}"', 'info')
+            return redirect(admin_url('/posts'))
+        elif saved:
             git_commit(f"Update post: {data['title']}")
             # Rebuild Hugo site after editing post
             rebuild_hugo_async()
             
-            # Send to Telegram if post is being published (was draft, now not draft)
-            slug = filename[:-3]  # Remove .md extension
-            if was_draft and not data['draft']:
-                send_to_telegram_async(data['title'], slug, data.get('description', ''), data.get('image', ''))
+            # Send to Telegram if post is being published (was draft, now not draft),
+            # unless another language variant of it has already been announced
+            slug = post_slug(filename)
+            if was_draft and not data['draft'] and published_translations(filename):
+                flash(f'Translation "{data["title"]}" published! Site is rebuilding...', 'success')
+            elif was_draft and not data['draft']:
+                send_to_telegram_async(data['title'], slug, data.get('description', ''), data.get('image', ''),
+                                       post_language(filename))
                 flash(f'Post "{data["title"]}" published and sent to Telegram! Site is rebuilding...', 'success')
             else:
                 flash(f'Post "{data["title"]}" updated successfully! Site is rebuilding...', 'success')
@@ -437,14 +1160,25 @@ def edit_post(filename):
     
     return render_template('edit_post.html', post=post)
 
-@app.route('/posts/delete/<filename>', methods=['POST'])
+@app.route('/posts/delete/<path:filename>', methods=['POST'])
 @login_required
 def delete_post(filename):
     """Delete post"""
-    file_path = POSTS_DIR / filename
-    if file_path.exists():
+    file_path = post_path(filename)
+    if file_path and file_path.exists():
         post = get_post(filename)
         file_path.unlink()
+        
+        # Deleting the last index.md of a page bundle removes the bundle with its resources,
+        # otherwise its remaining markdown resources would become standalone pages
+        bundle_dir = file_path.parent
+        is_bundle = split_content_name(file_path.name)[0] == 'index' and bundle_dir != POSTS_DIR.resolve()
+        if is_bundle and not any(split_content_name(f.name)[0] == 'index' for f in bundle_dir.glob('index*.md')):
+            shutil.rmtree(bundle_dir)
+            content_index.invalidate(bundle_dir)
+        else:
+            content_index.invalidate(file_path)
+        
         git_commit(f"Delete post: {post['title'] if post else filename}")
         # Rebuild Hugo site after deleting post
         rebuild_hugo_async()
@@ -454,6 +1188,72 @@ def delete_post(filename):
     
     return redirect(admin_url('/posts'))
 
+@app.route('/posts/history/<path:filename>')
+@login_required
+def post_history(filename):
+    """Revision history of a post with optional diff between two revisions"""
+    file_path = post_path(filename)
+    if not file_path or not file_path.exists() or not git_repo.git_dir:
+        flash('Post history not available', 'error')
+        return redirect(admin_url('/posts'))
+    
+    old, new = request.args.get('a'), request.args.get('b')
+    revisions, diff = [], None
+    try:
+        repo_path = git_repo.relative_path(file_path)
+    except ValueError:
+        flash('Post history not available', 'error')
+        return redirect(admin_url('/posts'))
+    
+    try:
+        revisions = git_repo.file_history(repo_path, limit=request.args.get('limit', 100, type=int))
+        labels = {r['sha']: r['short'] for r in revisions}
+        if old and new and (old not in labels or (new != 'current' and new not in labels)):
+            flash('Unknown revision', 'error')
+        elif old and new:
+            if new == 'current':
+                new_text = file_path.read_text(encoding='utf-8')
+            else:
+                new_text = git_repo.read_file(new, repo_path)
+            diff = diff_texts(
+                git_repo.read_file(old, repo_path), new_text,
+                labels[old], labels.get(new, 'current')
+            )
+    except (KeyError, ValueError, zlib.error) as e:
+        print(f"[Git] History error for {repo_path}: {e}")
+        flash(f'Error reading history: {e}', 'error')
+    
+    return render_template('post_history.html', post=get_post(filename), filename=filename,
+                           revisions=revisions, diff=diff, old=old, new=new)
+
+@app.route('/posts/restore/<sha>/<path:filename>', methods=['POST'])
+@login_required
+def restore_post(sha, filename):
+    """Restore a post to an earlier revision"""
+    file_path = post_path(filename)
+    if not file_path or not re.fullmatch(r'[0-9a-f]{40}', sha) or not git_repo.git_dir:
+        flash('Post not found', 'error')
+        return redirect(admin_url('/posts'))
+    
+    try:
+        content = git_repo.read_file(sha, git_repo.relative_path(file_path))
+    except (KeyError, ValueError, zlib.error) as e:
+        content = None
+        print(f"[Git] Restore failed: {e}")
+    if content is None:
+        flash('Revision not found', 'error')
+        return redirect(admin_url('/posts/history/' + filename))
+    
+    if not write_if_changed(file_path, content):
+        flash(f'Post already matches revision {sha[:7]}', 'info')
+        return redirect(admin_url('/posts/edit/' + filename))
+    
+    post = get_post(filename)
+    git_commit(f"Restore post: {post['title'] if post else filename} to {sha[:7]}")
+    rebuild_hugo_async()
+    flash(f'Post restored to revision {sha[:7]}! Site is rebuilding...', 'success')
+    return redirect(admin_url('/posts/edit/' + filename))
+
 @app.route('/posts/autosave', methods=['POST'])
 @login_required
 def autosave_post():
@@ -474,12 +1274,22 @@ def autosave_post():
     if not slug:
         slug = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
     
-    # Build front matter
-    front_matter = {
+    # Determine filename
+    if filename:
+        file_path = post_path(filename)
+        if file_path is None:
+            return jsonify({'success': False, 'error': 'Invalid filename'})
+    else:
+        file_path = POSTS_DIR / f'{slug}.md'
+    
+    # Build front matter, keeping keys the editor doesn't manage
+    existing = existing_frontmatter(file_path)
+    front_matter = {k: v for k, v in existing.items() if k not in MANAGED_FRONTMATTER_KEYS}
+    front_matter.update({
         'title': title,
-        'date': data.get('date', datetime.now().strftime('%Y-%m-%dT%H:%M:%S+03:00')),
+        'date': data.get('date') or format_frontmatter_date(existing.get('date') or datetime.now()),
         'draft': True,  # Auto-saved posts are always drafts
-    }
+    })
     
     if data.get('description'):
         front_matter['description'] = data['description']
@@ -493,19 +1303,14 @@ def autosave_post():
     # Create markdown content
     md_content = '---\n' + yaml.dump(front_matter, allow_unicode=True, default_flow_style=False) + '---\n\n' + content
     
-    # Determine filename
-    if filename:
-        file_path = POSTS_DIR / filename
-    else:
-        file_path = POSTS_DIR / f'{slug}.md'
-    
     # Save to file
     try:
-        file_path.write_text(md_content, encoding='utf-8')
+        changed = write_if_changed(file_path, md_content)
         return jsonify({
             'success': True, 
-            'message': 'Draft auto-saved',
-            'filename': file_path.name,
+            'changed': changed,
+            'message': 'Draft auto-saved' if changed else 'No changes',
+            'filename': filename or file_path.name,
             'timestamp': datetime.now().strftime('%H:%M:%S')
         })
     except Exception as e:
@@ -658,7 +1463,7 @@ def get_announcement():
     return {'title': '网站公告', 'text': '', 'icon': '📢', 'enabled': False}
 
 def save_announcement(title, text, icon='📢'):
-    """Save announcement to custom partial"""
+    """Save announcement to custom partial; returns (success, changed)"""
     template = '''<div class="bg-primary/10 border-primary/30 rounded-xl border p-6 shadow-sm mb-6">
   <div class="flex items-start gap-3">
     <div class="text-primary text-2xl flex-shrink-0">
@@ -678,11 +1483,10 @@ def save_announcement(title, text, icon='📢'):
 '''
     try:
         content = template.format(title=title, text=text, icon=icon)
-        ANNOUNCEMENT_FILE.write_text(content, encoding='utf-8')
-        return True
+        return True, write_if_changed(ANNOUNCEMENT_FILE, content)
     except Exception as e:
         print(f"Error saving announcement: {e}")
-        return False
+        return False, False
 
 @app.route('/announcement', methods=['GET', 'POST'])
 @login_required
@@ -695,13 +1499,18 @@ def announcement():
         
         if not text:
             flash('Announcement text is required', 'error')
-        elif save_announcement(title, text, icon):
-            git_commit(f"Update announcement: {title}")
-            rebuild_hugo_async()
-            flash('Announcement updated successfully! Site is rebuilding...', 'success')
-            return redirect(admin_url('/announcement'))
         else:
-            flash('Error saving announcement', 'error')
+            saved, changed = save_announcement(title, text, icon)
+            if saved and not changed:
+                flash('No changes to save in announcement', 'info')
+                return redirect(admin_url('/announcement'))
+            elif saved:
+                git_commit(f"Update announcement: {title}")
+                rebuild_hugo_async()
+                flash('Announcement updated successfully! Site is rebuilding...', 'success')
+                return redirect(admin_url('/announcement'))
+            else:
+                flash('Error saving announcement', 'error')
     
     current = get_announcement()
     return render_template('announcement.html', announcement=current)